@@ -1,6 +1,9 @@
 from fastmcp import FastMCP
 import os
 import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Optional
 import json
 
@@ -11,8 +14,17 @@ CATEGORIES_PATH = os.path.join(BASE_DIR, "categories.json")
 
 mcp = FastMCP("Puneeth-Expense-Tracker")
 
+def connect_db():
+    """Open a connection that waits on the write lock instead of failing with 'database is locked'"""
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.execute("PRAGMA synchronous=NORMAL") # Per-connection; safe with WAL
+    return conn
+
 def initialize_db():
     with sqlite3.connect(DB_PATH) as conn:
+        # WAL is persistent in the db file: readers no longer block the writer
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("""
             CREATE TABLE IF NOT EXISTS EXPENSES(
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,50 +44,97 @@ if not os.path.exists(CATEGORIES_PATH):
 
 initialize_db()
 
+# Reuse a handful of open connections instead of reconnecting on every tool call
+POOL_SIZE = 8
+db_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+for _ in range(POOL_SIZE):
+    db_pool.put(connect_db())
+
+# Writers queue up here instead of racing for SQLite's file lock; WAL readers skip it
+WRITE_LOCK = threading.Lock()
+
+@contextmanager
+def get_db_connection():
+    """Borrow a connection from the pool and always hand it back"""
+    conn = db_pool.get()
+    try:
+        yield conn
+    finally:
+        db_pool.put(conn)
+
+def rows_as_dicts(cursor):
+    """Turn plain tuple rows into dicts, reading the column names once per query"""
+    keys = [d[0] for d in cursor.description]
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
 @mcp.tool()
 def add_expense(date: str, amount: float, category: str, subcategory: str = '', note: str = ''):
     """Add a new expense to the database"""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO expenses(date, amount, category, subcategory, note) VALUES(?,?,?,?,?)",
+    with WRITE_LOCK, get_db_connection() as conn:
+        # RETURNING hands back the id from the INSERT itself; in autocommit mode the
+        # statement commits once its single row has been fetched
+        (new_id,) = conn.execute(
+            "INSERT INTO expenses(date, amount, category, subcategory, note) VALUES(?,?,?,?,?) RETURNING id",
             (date, amount, category, subcategory, note)
-        )
-        conn.commit()
-        return {'status': 'ok', 'id': cursor.lastrowid}
+        ).fetchone()
+        return {'status': 'ok', 'id': new_id}
+
+@mcp.tool()
+def add_expenses_bulk(items: list[dict]):
+    """Add many expenses at once. Each item needs date, amount and category; subcategory and note are optional"""
+    try:
+        rows = [
+            (item['date'], item['amount'], item['category'], item.get('subcategory', ''), item.get('note', ''))
+            for item in items
+        ]
+    except KeyError as e:
+        return f"Error: Every expense needs date, amount and category (missing {e})."
+    with WRITE_LOCK, get_db_connection() as conn:
+        # One transaction for the whole batch: a single commit instead of one per row
+        conn.execute("BEGIN")
+        with conn: # Commits on success, rolls back on error
+            conn.executemany(
+                "INSERT INTO expenses(date, amount, category, subcategory, note) VALUES(?,?,?,?,?)",
+                rows
+            )
+        return {'status': 'ok', 'count': len(rows)}
 
 @mcp.tool()
 def list_expenses(start_date: str, end_date: str):
     """List expenses within the inclusive Date Range (YYYY-MM-DD)"""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row # Allows dictionary-like access
+    with get_db_connection() as conn:
         cursor = conn.execute(
             "SELECT * FROM expenses WHERE date BETWEEN ? AND ?",
             (start_date, end_date)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return rows_as_dicts(cursor)
+
+# Both summary shapes are fixed, so sqlite3's statement cache can reuse them
+SUMMARY_QUERY = "SELECT category, SUM(amount) as total FROM expenses WHERE date BETWEEN ? AND ? GROUP BY category ORDER BY total DESC"
+CATEGORY_SUMMARY_QUERY = "SELECT category, SUM(amount) as total FROM expenses WHERE date BETWEEN ? AND ? AND category = ? GROUP BY category ORDER BY total DESC"
 
 @mcp.tool()
 def summarize_expenses(start_date: str, end_date: str, category: Optional[str] = None):
     """Summarize expenses by category within a date range"""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        query = "SELECT category, SUM(amount) as total FROM expenses WHERE date BETWEEN ? AND ?"
-        params = [start_date, end_date]
-        
+    with get_db_connection() as conn:
         if category:
-            query += " AND category = ?"
-            params.append(category)
-        
-        query += " GROUP BY category ORDER BY total DESC"
-        cursor = conn.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+            cursor = conn.execute(CATEGORY_SUMMARY_QUERY, (start_date, end_date, category))
+        else:
+            cursor = conn.execute(SUMMARY_QUERY, (start_date, end_date))
+        return rows_as_dicts(cursor)
+
+# Categories file contents, re-read only when the file's mtime changes
+categories_cache = {"mtime": None, "data": None}
 
 @mcp.resource("expense://categories")
 def get_categories() -> str:
     """Fetch the list of valid expense categories"""
-    with open(CATEGORIES_PATH, 'r') as f:
-        return f.read()
+    mtime = os.stat(CATEGORIES_PATH).st_mtime_ns
+    if mtime != categories_cache["mtime"]:
+        with open(CATEGORIES_PATH, 'r') as f:
+            categories_cache["data"] = f.read()
+        categories_cache["mtime"] = mtime
+    return categories_cache["data"]
 
 if __name__ == "__main__":
     # Run the MCP server with HTTP transport
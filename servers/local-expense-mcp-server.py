@@ -1,7 +1,12 @@
 import os
+import re
+import asyncio
+import datetime
+import functools
+import threading
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from fastmcp import FastMCP
 from contextlib import contextmanager
@@ -14,82 +19,421 @@ CATEGORIES_PATH = os.path.join(os.path.dirname(__file__), "resources/categories.
 mcp = FastMCP("Expense-Tracker-Postgres")
 
 # 2. Initialize Connection Pool 
-# This prevents opening/closing a handshake for every single request
+# This prevents opening/closing a handshake for every single request.
+# The pool opens MIN_CONNECTIONS up front and closes any extra connection as soon
+# as it is returned, so a low minimum means every burst pays a fresh TLS handshake.
+MIN_CONNECTIONS = 5
+MAX_CONNECTIONS = 20
+# Tools run in worker threads, so more of them can want a connection than the pool holds
+db_slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers whether it has run its one-time setup (see section 3)."""
+    initialized = False
+
+    def initialize(self):
+        """Applies SESSION_SETUP the first time the pool hands this connection out."""
+        with self.cursor() as cur:
+            cur.execute(SESSION_SETUP)
+        self.commit()  # No-op in autocommit; the settings and statements outlive transactions anyway
+        self.initialized = True
+
 try:
     db_pool = psycopg2.pool.ThreadedConnectionPool(
-        minconn=1,
-        maxconn=20,
+        minconn=MIN_CONNECTIONS,
+        maxconn=MAX_CONNECTIONS,
         dsn=DB_URL,
-        cursor_factory=RealDictCursor
+        connection_factory=PooledConnection
     )
 except Exception as e:
     print(f"Error creating connection pool: {e}")
     db_pool = None
 
+# 3. Prepared Statements
+# The hot queries never change shape, so each physical connection PREPAREs them once
+# and tools call EXECUTE: Postgres skips parsing and planning on every call.
+# Parameter types are inferred from the expenses columns.
+PREPARED_STATEMENTS = {
+    "add_expense_stmt": """
+        INSERT INTO expenses (user_id, date, amount, category, subcategory, note)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id
+    """,
+    "list_expenses_stmt": """
+        SELECT id, date, amount, category, subcategory, note FROM expenses
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3
+        ORDER BY date ASC, id ASC
+        LIMIT $4 OFFSET $5
+    """,
+    "summary_stmt": """
+        SELECT category, SUM(amount) as total_amount
+        FROM expenses
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3
+        GROUP BY category ORDER BY category ASC
+    """,
+    "category_summary_stmt": """
+        SELECT category, SUM(amount) as total_amount
+        FROM expenses
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3 AND category = $4
+        GROUP BY category ORDER BY category ASC
+    """,
+    "delete_expense_stmt": "DELETE FROM expenses WHERE id = $1 AND user_id = $2",
+}
+# update_expense has one statement per combination of provided fields, keyed by a
+# bitmask (bit 0 = date ... bit 4 = note); UPDATE_EXECUTES holds the matching EXECUTE
+UPDATE_COLUMNS = ("date", "amount", "category", "subcategory", "note")
+UPDATE_EXECUTES = {}
+for mask in range(1, 1 << len(UPDATE_COLUMNS)):
+    columns = [column for bit, column in enumerate(UPDATE_COLUMNS) if mask & (1 << bit)]
+    assignments = ", ".join(f"{column} = ${n}" for n, column in enumerate(columns, start=1))
+    PREPARED_STATEMENTS[f"update_expense_stmt_{mask}"] = (
+        f"UPDATE expenses SET {assignments} WHERE id = ${len(columns) + 1} AND user_id = ${len(columns) + 2}"
+    )
+    UPDATE_EXECUTES[mask] = f"EXECUTE update_expense_stmt_{mask} ({', '.join(['%s'] * (len(columns) + 2))})"
+# The date-range scans must never switch to a generic plan: ranges vary from a day
+# to years, and one plan for all of them can settle on a seq scan. SET LOCAL travels
+# in the same execute and ends with the transaction, so add/delete/update keep
+# their cheap generic plans.
+CUSTOM_PLAN = "SET LOCAL plan_cache_mode = force_custom_plan;\n"
+LIST_EXECUTE = CUSTOM_PLAN + "EXECUTE list_expenses_stmt (%s, %s, %s, %s, %s)"
+SUMMARY_EXECUTE = CUSTOM_PLAN + "EXECUTE summary_stmt (%s, %s, %s)"
+CATEGORY_SUMMARY_EXECUTE = CUSTOM_PLAN + "EXECUTE category_summary_stmt (%s, %s, %s, %s)"
+# Session settings live as long as the connection, so they're applied once, not per call
+SESSION_SETTINGS = {
+    "application_name": "expense-mcp-local",  # Names this server in pg_stat_activity
+    "statement_timeout": "30s",  # A runaway query fails instead of pinning a pooled connection
+}
+# The SETs and all PREPAREs go out in one execute: one round trip per new connection
+SESSION_SETUP = ";\n".join(
+    [f"SET {name} = '{value}'" for name, value in SESSION_SETTINGS.items()]
+    + [f"PREPARE {name} AS {query}" for name, query in PREPARED_STATEMENTS.items()]
+)
+
 @contextmanager
-def get_db_connection():
+def get_db_connection(transaction=False):
     """
     Context manager to get a connection from the pool and return it safely.
     This ensures connections are never leaked, even if code crashes.
+    By default the connection is in autocommit mode: a single statement is its own
+    transaction, with no BEGIN or COMMIT round trips. Pass transaction=True when
+    several statements must commit together, then commit.
     """
     
     if not db_pool:
         raise Exception("Database pool is not initialized.")
     
-    conn = db_pool.getconn()
+    # Wait for a free connection instead of failing with "pool exhausted"
+    with db_slots:
+        conn = db_pool.getconn()
+        try:
+            conn.autocommit = not transaction
+            if not conn.initialized:
+                conn.initialize()
+        except Exception:
+            # PREPAREs that ran before a failed setup stay on the backend, so a retry on
+            # this connection would fail with "already exists": discard it instead
+            db_pool.putconn(conn, close=True)
+            raise
+        try:
+            yield conn
+        finally:
+            # Put the connection back in the pool so others can use it
+            db_pool.putconn(conn)
+
+# Composite indexes for the hot filters: every query narrows by user_id, then a
+# date range (optionally a category), and list_expenses orders by date.
+# INCLUDE (amount) lets the category summary SUM straight from the index without
+# visiting the table; it replaces the older index of the same columns.
+# Built CONCURRENTLY so they never block writes on a live table, and opt-in with
+# BOOTSTRAP_INDEXES=1 so only the deploy that owns the schema runs DDL.
+INDEX_DDL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_cat_date_amount ON expenses (user_id, category, date) INCLUDE (amount)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_expenses_user_cat_date",
+]
+
+# A CONCURRENTLY build that fails leaves an INVALID index behind, and IF NOT EXISTS
+# then skips it forever; such leftovers are dropped so the DDL builds them again
+INVALID_INDEXES = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE i.indrelid = 'expenses'::regclass AND NOT i.indisvalid AND c.relname = ANY(%s)
+"""
+
+def drop_invalid_indexes(cur, names):
+    """Drops whichever of the named indexes on expenses were left INVALID."""
+    cur.execute(INVALID_INDEXES, (list(names),))
+    for (name,) in cur.fetchall():
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+def ensure_indexes():
+    """Creates the query indexes if they are missing. Cheap no-op once they exist."""
+    # Autocommit connection: CONCURRENTLY cannot run inside a transaction block
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # Building an index on a big table can outlast the per-query timeout
+            cur.execute("SET statement_timeout = 0")
+            try:
+                drop_invalid_indexes(cur, ("idx_expenses_user_date", "idx_expenses_user_cat_date_amount"))
+                for ddl in INDEX_DDL:
+                    cur.execute(ddl)
+                # Fresh statistics so the planner picks the new indexes right away
+                cur.execute("ANALYZE expenses")
+            finally:
+                cur.execute(f"SET statement_timeout = '{SESSION_SETTINGS['statement_timeout']}'")
+
+# Monthly per-category totals (the same rollup the cloud server keeps), so summaries
+# over whole months read a few pre-aggregated rows instead of re-summing every expense.
+# A row trigger on expenses keeps them current: each write adjusts only its own
+# (user_id, month, category) row, whichever server made it, and leaves the rest alone.
+# Installing locks out writes and backfills the whole table, so it is opt-in with
+# BOOTSTRAP_INDEXES=1 like the indexes; every server reads the totals once installed.
+# remote-expense-mcp-server.py carries the same DDL (each server deploys as one file): change
+# both copies together and bump MONTHLY_ROLLUP_VERSION. A server whose version differs
+# from the installed one reads the base table instead of trusting the totals.
+MONTHLY_ROLLUP_VERSION = "expenses_monthly_totals v2"
+MONTHLY_ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS expenses_monthly_totals (
+        user_id text NOT NULL,
+        month date NOT NULL,
+        category text NOT NULL,
+        total numeric NOT NULL,
+        expense_count bigint NOT NULL,
+        PRIMARY KEY (user_id, month, category)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION expenses_monthly_totals_apply() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        -- TRUNCATE skips row triggers, so a statement trigger empties the totals with it
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM expenses_monthly_totals;
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE expenses_monthly_totals
+            SET total = total - OLD.amount, expense_count = expense_count - 1
+            WHERE user_id = OLD.user_id AND month = date_trunc('month', OLD.date::date)::date
+              AND category = OLD.category;
+            -- A month with no expenses left drops out of summaries instead of showing 0
+            DELETE FROM expenses_monthly_totals
+            WHERE user_id = OLD.user_id AND month = date_trunc('month', OLD.date::date)::date
+              AND category = OLD.category AND expense_count = 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO expenses_monthly_totals AS t
+            VALUES (NEW.user_id, date_trunc('month', NEW.date::date)::date, NEW.category, NEW.amount, 1)
+            ON CONFLICT (user_id, month, category)
+            DO UPDATE SET total = t.total + EXCLUDED.total, expense_count = t.expense_count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    f"COMMENT ON FUNCTION expenses_monthly_totals_apply() IS '{MONTHLY_ROLLUP_VERSION}'",
+    # Backfill from scratch while the lock (taken first) keeps writers out
+    "DELETE FROM expenses_monthly_totals",
+    """
+    INSERT INTO expenses_monthly_totals
+    SELECT user_id, date_trunc('month', date::date)::date, category, SUM(amount), COUNT(*)
+    FROM expenses
+    GROUP BY 1, 2, 3
+    """,
+    # Note-only updates don't touch the totals, so they skip the trigger
+    "DROP TRIGGER IF EXISTS expenses_monthly_totals_trg ON expenses",
+    """
+    CREATE TRIGGER expenses_monthly_totals_trg
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, date, amount, category ON expenses
+    FOR EACH ROW EXECUTE FUNCTION expenses_monthly_totals_apply()
+    """,
+    "DROP TRIGGER IF EXISTS expenses_monthly_totals_truncate_trg ON expenses",
+    """
+    CREATE TRIGGER expenses_monthly_totals_truncate_trg
+    AFTER TRUNCATE ON expenses
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_monthly_totals_apply()
+    """,
+    # Superseded: it was refreshed in full on every write
+    "DROP MATERIALIZED VIEW IF EXISTS expenses_monthly",
+]
+MONTHLY_ROLLUP_READY = False
+# The version installed in the database, read from the trigger function's comment
+ROLLUP_VERSION_QUERY = """
+    SELECT obj_description(t.tgfoid, 'pg_proc') FROM pg_trigger t
+    WHERE t.tgrelid = 'expenses'::regclass AND t.tgname = 'expenses_monthly_totals_trg'
+"""
+
+def installed_rollup_version(cur):
+    """The MONTHLY_ROLLUP_VERSION the database's trigger was installed with, or None."""
+    cur.execute(ROLLUP_VERSION_QUERY)
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def ensure_monthly_rollup():
+    """
+    Installs (or upgrades) the monthly totals when opted in with BOOTSTRAP_INDEXES=1.
+    True when the database runs this server's MONTHLY_ROLLUP_VERSION, so it can be read.
+    """
+    # The lock, backfill and trigger must commit together
+    with get_db_connection(transaction=True) as conn:
+        with conn.cursor() as cur:
+            if installed_rollup_version(cur) != MONTHLY_ROLLUP_VERSION and os.getenv("BOOTSTRAP_INDEXES") == "1":
+                # Blocks writes (not reads) until commit, so no row slips between the
+                # backfill and the trigger; re-check in case another server just did it
+                cur.execute("LOCK TABLE expenses IN SHARE ROW EXCLUSIVE MODE")
+                if installed_rollup_version(cur) != MONTHLY_ROLLUP_VERSION:
+                    # The one-off backfill reads the whole table; lifted until commit only
+                    cur.execute("SET LOCAL statement_timeout = 0")
+                    for ddl in MONTHLY_ROLLUP_DDL:
+                        cur.execute(ddl)
+            ready = installed_rollup_version(cur) == MONTHLY_ROLLUP_VERSION
+        conn.commit()
+    return ready
+
+if db_pool and os.getenv("BOOTSTRAP_INDEXES") == "1":
     try:
-        yield conn
-    finally:
-        # Put the connection back in the pool so others can use it
-        db_pool.putconn(conn)
+        ensure_indexes()
+    except Exception as e:
+        # Missing indexes only cost speed, so keep serving
+        print(f"Error creating indexes: {e}")
+if db_pool:
+    try:
+        MONTHLY_ROLLUP_READY = ensure_monthly_rollup()
+    except Exception as e:
+        # Without the rollup, summaries simply read the base table
+        print(f"Error creating monthly rollup: {e}")
+
+def run_in_thread(fn):
+    """
+    Runs a blocking psycopg2 tool in a worker thread, so the event loop keeps
+    serving other MCP calls while this one waits on Postgres.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return wrapper
+
+def parse_date(value):
+    """
+    Parses a YYYY-MM-DD date locally, so a bad date never costs a round trip and a
+    good one binds as a real DATE. Returns None when the value isn't a valid date.
+    """
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
 
 ## Tool-1: Adding expense
 @mcp.tool()
+@run_in_thread
 def add_expense(date: str, amount: float, category: str, subcategory: str = '', note: str = '', user_id: str = 'guest'):
     """Add a new expense. User ID defaults to guest."""
+    day = parse_date(date)
+    if day is None:
+        return f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    """
-                    INSERT INTO expenses (user_id, date, amount, category, subcategory, note)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (user_id, date, amount, category, subcategory, note)
+                    "EXECUTE add_expense_stmt (%s, %s, %s, %s, %s, %s)",
+                    (user_id, day, amount, category, subcategory, note)
                 )
-                new_id = cur.fetchone()['id']
-                conn.commit()
+                new_id = cur.fetchone()[0]
                 return f'Expense added successfully. ID: {new_id}'
     except Exception as e:
         return f"Database error: {str(e)}"
 
+## Tool-1b: Bulk import
+@mcp.tool()
+@run_in_thread
+def add_expenses_bulk(items: list[dict], user_id: str = 'guest'):
+    """
+    Add many expenses in one call, e.g. a month of receipts.
+    Each item needs date, amount and category; subcategory and note are optional.
+    """
+    # Validate every date up front so a bad row doesn't waste a round trip
+    days = [parse_date(item.get('date')) for item in items]
+    for item, day in zip(items, days):
+        if day is None:
+            return f"Error: Invalid date format '{item.get('date')}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
+
+    try:
+        rows = [
+            (user_id, day, item['amount'], item['category'], item.get('subcategory', ''), item.get('note', ''))
+            for item, day in zip(items, days)
+        ]
+        # Every page of the import commits together, or not at all
+        with get_db_connection(transaction=True) as conn:
+            with conn.cursor() as cur:
+                # One multi-row INSERT ... VALUES (...), (...) per page instead of a round trip per row
+                new_rows = execute_values(
+                    cur,
+                    "INSERT INTO expenses (user_id, date, amount, category, subcategory, note) VALUES %s RETURNING id",
+                    rows,
+                    page_size=500,
+                    fetch=True
+                )
+                conn.commit()
+                new_ids = ', '.join(str(row[0]) for row in new_rows)
+                return f"{len(new_rows)} expenses added successfully. IDs: {new_ids}"
+    except KeyError as e:
+        return f"Error: Every expense needs date, amount and category (missing {e})."
+    except Exception as e:
+        return f"Database error: {str(e)}"
+
 ## Tool-2: List expenses
+# One page per call keeps a wide date range from streaming thousands of rows back to the model
+LIST_PAGE_SIZE = 500
+MAX_LIST_PAGE_SIZE = 5000
+# Cursors return plain tuples; the column names are attached once per row here
+# instead of the cursor building a RealDictRow for every row it fetches
+LIST_COLUMNS = ("id", "date", "amount", "category", "subcategory", "note")
+
 @mcp.tool()
-def list_expenses(start_date: str, end_date: str, user_id: str = 'guest'):
-    """List expenses for a specific date range."""
+@run_in_thread
+def list_expenses(start_date: str, end_date: str, user_id: str = 'guest', limit: int = LIST_PAGE_SIZE, offset: int = 0):
+    """List expenses for a specific date range, one page of at most `limit` rows; raise `offset` for the next page."""
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    """
-                    SELECT * FROM expenses
-                    WHERE user_id = %s AND
-                    date BETWEEN %s AND %s
-                    ORDER BY date ASC
-                    """,
-                    (user_id, start_date, end_date)
+                    LIST_EXECUTE,
+                    (user_id, start_date, end_date, min(limit, MAX_LIST_PAGE_SIZE), offset)
                 )
                 rows = cur.fetchall()
                 # Return empty list description instead of None to help LLM
                 if not rows:
                     return f"No expenses found for user {user_id} between {start_date} and {end_date}."
-                return str(rows)
+                return [dict(zip(LIST_COLUMNS, row)) for row in rows]  # FastMCP serializes these to JSON
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ### Tool-3: Summarize expenses
+SUMMARY_COLUMNS = ("category", "total_amount")
+MONTHLY_SUMMARY_QUERY = """
+    SELECT category, SUM(total) as total_amount
+    FROM expenses_monthly_totals
+    WHERE user_id = %s AND month BETWEEN %s AND %s
+    GROUP BY category ORDER BY category ASC
+"""
+MONTHLY_CATEGORY_SUMMARY_QUERY = """
+    SELECT category, SUM(total) as total_amount
+    FROM expenses_monthly_totals
+    WHERE user_id = %s AND month BETWEEN %s AND %s AND category = %s
+    GROUP BY category ORDER BY category ASC
+"""
+
+def spans_whole_months(start_date, end_date):
+    """True when the range runs from the 1st of a month to the last day of a month."""
+    try:
+        start = datetime.date.fromisoformat(start_date)
+        end = datetime.date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        return False
+    return start.day == 1 and (end + datetime.timedelta(days=1)).day == 1
+
 @mcp.tool()
+@run_in_thread
 def summarize_expenses(start_date: str, end_date: str, category: str | None = None, user_id: str = 'guest'):
     """
     Summarize expenses with optional category filter.
@@ -97,57 +441,59 @@ def summarize_expenses(start_date: str, end_date: str, category: str | None = No
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                query = """
-                    SELECT category, SUM(amount) as total_amount
-                    FROM expenses
-                    WHERE user_id = %s AND date BETWEEN %s AND %s
-                """
-                parameters = [user_id, start_date, end_date]
-                
+                # Whole-month ranges can be answered from the monthly rollup
+                if MONTHLY_ROLLUP_READY and spans_whole_months(start_date, end_date):
+                    query = MONTHLY_SUMMARY_QUERY
+                    category_query = MONTHLY_CATEGORY_SUMMARY_QUERY
+                else:
+                    query = SUMMARY_EXECUTE
+                    category_query = CATEGORY_SUMMARY_EXECUTE
+
                 # Only filter by category if one is actually provided
                 if category:
-                    query += " AND category = %s"
-                    parameters.append(category)
-                
-                query += " GROUP BY category ORDER BY category ASC"
-                
-                cur.execute(query, parameters)
+                    cur.execute(category_query, (user_id, start_date, end_date, category))
+                else:
+                    cur.execute(query, (user_id, start_date, end_date))
                 rows = cur.fetchall()
                 if not rows:
                     return f"No expenses found for user {user_id}."
-                return str(rows)
+                return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]  # FastMCP serializes these to JSON
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ### Tool-4: Delete expense
 @mcp.tool()
+@run_in_thread
 def delete_expense(expense_id: int, user_id: str = 'guest'):
     """Delete an expense by ID."""
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    "DELETE FROM expenses WHERE id = %s AND user_id = %s",
+                    "EXECUTE delete_expense_stmt (%s, %s)",
                     (expense_id, user_id)
                 )
                 if cur.rowcount == 0:
                     return f"Expense ID {expense_id} not found for user {user_id}."
-                conn.commit()
                 return f"Expense ID {expense_id} deleted successfully."
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ## Tool-5: Update Expense
+# Leading/trailing runs of whitespace and quotes, trimmed in a single pass
+EDGE_QUOTES_RE = re.compile(r"""^[\s'"]+|[\s'"]+$""")
+
 def clean_input(value):
     """
     Helper: Removes extra quotes and spaces that might confuse the database.
     Example: "'2026-01-01'" -> "2026-01-01"
     """
     if isinstance(value, str):
-        return value.strip().strip("'").strip('"')
+        return EDGE_QUOTES_RE.sub('', value)
     return value
 
 @mcp.tool()
+@run_in_thread
 def update_expense(
     expense_id: int, 
     date: str | int | None = None,     # Allow int so we can catch it gracefully
@@ -168,64 +514,55 @@ def update_expense(
         subcategory = clean_input(subcategory)
         note = clean_input(note)
 
-        # 2. VALIDATION: Check if Date is a number (e.g. 2026) instead of a string
-        if isinstance(date, int) or (isinstance(date, str) and date.isdigit()):
-            return f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
+        # 2. VALIDATION: Parse the date here (catches 2026 as well as 2025-13-45)
+        if date:
+            day = parse_date(date)
+            if day is None:
+                return f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
+            date = day
+
+        # 3. Work out which fields were provided (same order as UPDATE_COLUMNS)
+        values = (date, amount, category, subcategory, note)
+        provided = (bool(date), amount is not None, bool(category), subcategory is not None, note is not None)
+        mask = sum(1 << bit for bit, is_set in enumerate(provided) if is_set)
+
+        if not mask:
+            return "No fields provided for update."
+
+        params = [value for value, is_set in zip(values, provided) if is_set]
+        params.extend([expense_id, user_id])
 
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                fields_to_update = []
-                params = []
-
-                # 3. Build the query dynamically based on what was provided
-                if date:
-                    fields_to_update.append("date = %s")
-                    params.append(date)
-                if amount is not None:
-                    fields_to_update.append("amount = %s")
-                    params.append(amount)
-                if category:
-                    fields_to_update.append("category = %s")
-                    params.append(category)
-                if subcategory is not None: 
-                    fields_to_update.append("subcategory = %s")
-                    params.append(subcategory)
-                if note is not None:
-                    fields_to_update.append("note = %s")
-                    params.append(note)
-
-                if not fields_to_update:
-                    return "No fields provided for update."
-
-                # 4. Final Query Construction
-                query = f"""
-                    UPDATE expenses
-                    SET {', '.join(fields_to_update)}
-                    WHERE id = %s AND user_id = %s
-                """
-                params.extend([expense_id, user_id])
-
-                cur.execute(query, params)
+                # 4. Run the statement prepared for this combination of fields
+                cur.execute(UPDATE_EXECUTES[mask], params)
                 
                 # 5. Check if we actually found the row
                 if cur.rowcount == 0:
                     return f"Expense ID {expense_id} not found for user {user_id}."
                 
-                conn.commit()
                 return f"Expense ID {expense_id} updated successfully."
                 
     except Exception as e:
         return f"Database error: {str(e)}"
     
 
+# Categories file contents, re-read only when the file's mtime changes
+categories_cache = {"mtime": None, "data": None}
+
 @mcp.resource("expense://categories", mime_type="application/json")
 def categories():
     """Resource: Expense Categories"""
-    if not os.path.exists(CATEGORIES_PATH):
+    try:
+        mtime = os.stat(CATEGORIES_PATH).st_mtime_ns
+    except FileNotFoundError:
         return '{"error": "Categories file not found", "path": "' + CATEGORIES_PATH + '"}'
-        
-    with open(CATEGORIES_PATH, 'r') as f:
-        return f.read()
+
+    if mtime != categories_cache["mtime"]:
+        with open(CATEGORIES_PATH, 'r') as f:
+            categories_cache["data"] = f.read()
+        categories_cache["mtime"] = mtime
+    return categories_cache["data"]
 
 if __name__ == "__main__":
     # Ensure pool is closed on exit (optional but good practice)
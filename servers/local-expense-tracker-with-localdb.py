@@ -1,6 +1,7 @@
 from fastmcp import FastMCP
 import os
 import sqlite3
+import threading
 from typing import Optional
 
 DB_PATH= os.path.join(os.path.dirname(__file__),"expenses.db")
@@ -8,8 +9,18 @@ CATEGORIES_PATH= os.path.join(os.path.dirname(__file__),"categories.json")
 
 mcp= FastMCP("Puneeth-Expense-Tracker")
 
+# One connection for the whole process instead of a connect per tool call.
+# isolation_level=None: each statement commits on its own unless we BEGIN explicitly
+conn= sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+conn.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; no fsync per commit
+conn.execute("PRAGMA temp_store=MEMORY")
+conn.row_factory= sqlite3.Row # Rows carry their column names; dict(row) needs no zip
+# sqlite3 connections must not be used by two threads at once
+DB_LOCK= threading.Lock()
+
 def initialize_db():
-    with sqlite3.connect(DB_PATH) as conn:
+    with DB_LOCK:
         cursor= conn.cursor()
         #Create Table
         cursor.execute("""
@@ -29,20 +40,39 @@ initialize_db()
 @mcp.tool()
 def add_expense(date, amount, category, subcategory='',note=''):
     """ Add a new expense to the database"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with DB_LOCK:
         cursor= conn.cursor()
         cursor.execute(
             "Insert into expenses(date,amount, category, subcategory,note) values(?,?,?,?,?)",
             (date, amount, category, subcategory,note))
         return {'status':'ok','id':cursor.lastrowid}
 
+@mcp.tool()
+def add_expenses_bulk(items: list[dict]):
+    """ Add many expenses at once. Each item needs date, amount and category; subcategory and note are optional """
+    try:
+        rows= [
+            (item['date'], item['amount'], item['category'], item.get('subcategory',''), item.get('note',''))
+            for item in items
+        ]
+    except KeyError as e:
+        return f"Error: Every expense needs date, amount and category (missing {e})."
+    with DB_LOCK:
+        # One transaction for the whole batch: a single commit instead of one per row
+        conn.execute("BEGIN")
+        with conn: #Commits on success, rolls back on error
+            conn.executemany(
+                "Insert into expenses(date,amount, category, subcategory,note) values(?,?,?,?,?)",
+                rows)
+        return {'status':'ok','count':len(rows)}
+
 
 
 #List Expenses Tool
 @mcp.tool()
 def list_expenses(start_date, end_date):
     """ List Expense within the inclusive Data Range """
-    with sqlite3.connect(DB_PATH) as conn:
+    with DB_LOCK:
         cursor= conn.cursor()
         cursor.execute(
             """
@@ -51,17 +81,14 @@ def list_expenses(start_date, end_date):
             """,
             (start_date,end_date)
         )
-        #cur.description contains metadata: Columns
-        cols= [d[0] for d in cursor.description]
-        #Zip and Convert: [('id', 1), ('date', '2025-01-01'), ('amount', 50.00)...]
-        return [dict(zip(cols,r)) for r in cursor.fetchall()]
+        return [dict(r) for r in cursor.fetchall()]
     
 
 #Summarize based on category if included
 @mcp.tool()
 def summarize_expenses(start_date,end_date,category=None):
     """Summarize Expenses within the inclusive range and also summarize based on category if provided"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with DB_LOCK:
         query=  ("""
         Select category,sum(amount) from expenses
         where date between  ? and ?
@@ -78,13 +105,12 @@ def summarize_expenses(start_date,end_date,category=None):
             query,
             parameters
         )
-        cols= [d[0] for d in conn.description]
-        return [dict(zip(cols,r)) for r in cursor.fetchall()]
+        return [dict(r) for r in cursor.fetchall()]
 
 @mcp.tool()
 def delete_expense(id:int):
     """ Delete expense from expenses table with given expense id """
-    with sqlite3.connect(DB_PATH) as conn:
+    with DB_LOCK:
         cursor= conn.cursor()
         cursor.execute(
             """
@@ -98,44 +124,35 @@ def delete_expense(id:int):
             return{'status':'error', 'message':f'Expense ID {id} not found'}
         return {'status':'ok','message':f'Expense {id} deleted successfully'}
     
+# Every combination of updatable columns gets its UPDATE text built once at import,
+# keyed by a bitmask of the provided fields (bit 0 = date ... bit 4 = note)
+UPDATE_COLUMNS= ("date", "amount", "category", "subcategory", "note")
+UPDATE_QUERIES= {
+    mask: "Update expenses Set "
+          + ",".join(f"{column} = ?" for bit, column in enumerate(UPDATE_COLUMNS) if mask & (1 << bit))
+          + " Where id = ?"
+    for mask in range(1, 1 << len(UPDATE_COLUMNS))
+}
+
 @mcp.tool()
 def update_expense(id:int,date:Optional[str] =None, amount:Optional[float] =None, category:Optional[str] =None, subcategory:Optional[str] =None ,note:Optional[str]=None):
     """Update the expense with provided column values using the id provided """
-    with sqlite3.connect(DB_PATH) as conn:
-        fields_to_update= []
-        params=[]
-
-        # 1. Collect the fields that need updating
-        if date is not None:
-            fields_to_update.append("date = ?")
-            params.append(date)
-        if amount is not None:
-            fields_to_update.append("amount = ?")
-            params.append(amount)
-        if category is not None:
-            fields_to_update.append("category = ?")
-            params.append(category)
-        if subcategory is not None:
-            fields_to_update.append("subcategory = ?")
-            params.append(subcategory)
-        if note is not None:
-            fields_to_update.append("note = ?")
-            params.append(note)
-
-        # 2. Safety check: Did the user actually provide anything to update?
-        if len(fields_to_update)==0:
-            return{'status':'error', 'message':'No fields provided to update'}
-        
-        # 3. Build the dynamic SQL query
-        query= f""" Update expenses
-                Set {','.join(fields_to_update)}
-                Where id = ? """
-        
-        params.append(id)
+    # 1. Collect the fields that need updating (same order as UPDATE_COLUMNS)
+    values= (date, amount, category, subcategory, note)
+    mask= sum(1 << bit for bit, value in enumerate(values) if value is not None)
+
+    # 2. Safety check: Did the user actually provide anything to update?
+    if not mask:
+        return{'status':'error', 'message':'No fields provided to update'}
+
+    params= [value for value in values if value is not None]
+    params.append(id)
 
+    with DB_LOCK:
+        # 3. Pick the prebuilt query for this combination of fields
         cursor= conn.cursor()
         cursor.execute(
-            query,
+            UPDATE_QUERIES[mask],
             params
         )
         #Use rowcount for UPDATE and DELETE to verify changes happened.
@@ -145,12 +162,22 @@ def update_expense(id:int,date:Optional[str] =None, amount:Optional[float] =None
 
 
 
+# Categories file contents, re-read only when the file's mtime changes
+categories_cache= {"mtime": None, "data": None}
+
 @mcp.resource("expense://categories",mime_type="application/json")
 # expense://categories - MCP URI, mime_type="application/json" - Tells AI about what type of content you can expect
 def categories():
-    # Read fresh each time so you can edit the file without restarting
-    with open(CATEGORIES_PATH, 'r') as f:
-        return f.read()
+    # Steady state is a single stat; edits to the file are picked up without a restart
+    try:
+        mtime= os.stat(CATEGORIES_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return '{"categories": ["Food", "Transport", "Rent", "Utilities"]}'
+    if mtime != categories_cache["mtime"]:
+        with open(CATEGORIES_PATH, 'r') as f:
+            categories_cache["data"]= f.read()
+        categories_cache["mtime"]= mtime
+    return categories_cache["data"]
 
             
 
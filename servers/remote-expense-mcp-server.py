@@ -1,7 +1,15 @@
 import os
+import re
+import json
+import asyncio
+import inspect
+import datetime
+import functools
+import threading
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
+from psycopg2.extensions import parse_dsn, make_dsn
 from dotenv import load_dotenv
 from fastmcp import FastMCP
 from contextlib import contextmanager
@@ -182,7 +190,31 @@ mcp = FastMCP("Expense-Tracker")
 STARTUP_ERROR = None
 db_pool = None
 
+# Supabase's transaction-mode pooler (port 6543, or set POOL_MODE=transaction)
+# multiplexes many client connections onto a few Postgres backends, so the app
+# can hold far more of them. Consecutive transactions may run on different
+# backends, so session state such as PREPAREd statements must not be relied on.
+TRANSACTION_POOLING = (
+    os.getenv("POOL_MODE", "").lower() == "transaction"
+    or ":6543" in os.getenv("DATABASE_URL", "")
+)
+
+# Direct connections are reduced for cloud environments to avoid connection exhaustion
+MAX_CONNECTIONS = 100 if TRANSACTION_POOLING else 5
+# The pool closes connections above minconn as soon as they are returned, so keep
+# these open: otherwise every burst pays a fresh TLS handshake to Supabase
+MIN_CONNECTIONS = 5
+# Tools run in worker threads, so more calls than connections can be in flight at once
+db_slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+
 # 2. Initialize Connection Pool
+CONNECTION_DEFAULTS = {
+    "sslmode": "require",
+    "keepalives": "1",
+    "keepalives_idle": "30",
+    "connect_timeout": "10",
+}
+
 try:
     raw_url = os.getenv("DATABASE_URL")
     
@@ -195,17 +227,19 @@ try:
     if not DB_URL:
         raise ValueError("DATABASE_URL environment variable is missing or empty.")
 
-    # Force SSL for Supabase
-    if "sslmode" not in DB_URL:
-        separator = "&" if "?" in DB_URL else "?"
-        DB_URL = f"{DB_URL}{separator}sslmode=require"
+    # Parse the URL (or key=value DSN) once and fill in connection defaults the
+    # user didn't set: SSL for Supabase, and keepalives so idle pooled connections
+    # aren't silently dropped. Rebuilding it avoids hand-appended "?"/"&" mistakes.
+    dsn_params = parse_dsn(DB_URL)
+    for key, value in CONNECTION_DEFAULTS.items():
+        dsn_params.setdefault(key, value)
+    DB_URL = make_dsn(**dsn_params)
 
     # Create Pool (optimized for cloud deployment)
     db_pool = psycopg2.pool.ThreadedConnectionPool(
-        minconn=1,
-        maxconn=5,  # Reduced for cloud environments to avoid connection exhaustion
-        dsn=DB_URL,
-        cursor_factory=RealDictCursor
+        minconn=MIN_CONNECTIONS,
+        maxconn=MAX_CONNECTIONS,
+        dsn=DB_URL
     )
     print("Database pool initialized successfully.")
 
@@ -217,9 +251,12 @@ except Exception as e:
     db_pool = None
 
 @contextmanager
-def get_db_connection():
+def get_db_connection(transaction=False):
     """
     Context manager to get a connection from the pool and return it safely.
+    By default the connection is in autocommit mode: a single statement is its own
+    transaction, with no BEGIN or COMMIT round trips. Pass transaction=True when
+    several statements must commit together, then commit.
     """
     # 1. Check if we have a specific startup error to report
     if STARTUP_ERROR:
@@ -229,27 +266,292 @@ def get_db_connection():
     if not db_pool:
         raise Exception("Database pool is not initialized (Unknown Reason).")
     
-    conn = db_pool.getconn()
+    # 3. Wait for a free connection instead of failing with "pool exhausted"
+    with db_slots:
+        conn = db_pool.getconn()
+        try:
+            conn.autocommit = not transaction
+            yield conn
+        finally:
+            db_pool.putconn(conn)
+
+# Composite indexes for the hot filters: every query narrows by user_id, then a
+# date range (optionally a category), and list_expenses orders by date.
+# INCLUDE (amount) lets the category summary SUM straight from the index without
+# visiting the table; it replaces the older index of the same columns.
+# Built CONCURRENTLY so they never block writes on a live table, and opt-in with
+# BOOTSTRAP_INDEXES=1 so only the deploy that owns the schema runs DDL.
+INDEX_DDL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_cat_date_amount ON expenses (user_id, category, date) INCLUDE (amount)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_expenses_user_cat_date",
+]
+
+# A CONCURRENTLY build that fails leaves an INVALID index behind, and IF NOT EXISTS
+# then skips it forever; such leftovers are dropped so the DDL builds them again
+INVALID_INDEXES = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE i.indrelid = 'expenses'::regclass AND NOT i.indisvalid AND c.relname = ANY(%s)
+"""
+
+def drop_invalid_indexes(cur, names):
+    """Drops whichever of the named indexes on expenses were left INVALID."""
+    cur.execute(INVALID_INDEXES, (list(names),))
+    for (name,) in cur.fetchall():
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+def ensure_indexes():
+    """Creates the query indexes if they are missing. Cheap no-op once they exist."""
+    # Autocommit connection: CONCURRENTLY cannot run inside a transaction block
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            drop_invalid_indexes(cur, ("idx_expenses_user_date", "idx_expenses_user_cat_date_amount"))
+            for ddl in INDEX_DDL:
+                cur.execute(ddl)
+            # Fresh statistics so the planner picks the new indexes right away
+            cur.execute("ANALYZE expenses")
+
+# Optional per-user key that makes a retried add_expense a no-op (NULL keys never collide).
+# ALTER TABLE takes an ACCESS EXCLUSIVE lock, so the schema change is opt-in with
+# BOOTSTRAP_INDEXES=1 (as in the GitHub-auth server): only the deploy that owns the
+# schema runs it. Every deploy checks for the unique index the ON CONFLICT path needs.
+IDEMPOTENCY_DDL = [
+    "ALTER TABLE expenses ADD COLUMN IF NOT EXISTS idempotency_key text",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_idempotency ON expenses (user_id, idempotency_key)",
+]
+IDEMPOTENCY_INDEX_EXISTS = """
+    SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = 'idx_expenses_user_idempotency' AND i.indisvalid
+"""
+IDEMPOTENCY_READY = False
+
+def ensure_idempotency_key():
+    """Applies IDEMPOTENCY_DDL when opted in; True once the unique index exists."""
+    # Autocommit connection: CONCURRENTLY cannot run inside a transaction block
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if os.getenv("BOOTSTRAP_INDEXES") == "1":
+                drop_invalid_indexes(cur, ("idx_expenses_user_idempotency",))
+                for ddl in IDEMPOTENCY_DDL:
+                    cur.execute(ddl)
+            cur.execute(IDEMPOTENCY_INDEX_EXISTS)
+            return cur.fetchone() is not None
+
+# Monthly per-category totals, so summaries over whole months read a few
+# pre-aggregated rows instead of re-summing every expense in the range.
+# A row trigger on expenses keeps them current: each write adjusts only its own
+# (user_id, month, category) row, whichever server made it, and leaves the rest alone.
+# Installing locks out writes and backfills the whole table, so it is opt-in with
+# BOOTSTRAP_INDEXES=1 like the indexes; every server reads the totals once installed.
+# local-expense-mcp-server.py carries the same DDL (each server deploys as one file): change
+# both copies together and bump MONTHLY_ROLLUP_VERSION. A server whose version differs
+# from the installed one reads the base table instead of trusting the totals.
+MONTHLY_ROLLUP_VERSION = "expenses_monthly_totals v2"
+MONTHLY_ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS expenses_monthly_totals (
+        user_id text NOT NULL,
+        month date NOT NULL,
+        category text NOT NULL,
+        total numeric NOT NULL,
+        expense_count bigint NOT NULL,
+        PRIMARY KEY (user_id, month, category)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION expenses_monthly_totals_apply() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        -- TRUNCATE skips row triggers, so a statement trigger empties the totals with it
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM expenses_monthly_totals;
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE expenses_monthly_totals
+            SET total = total - OLD.amount, expense_count = expense_count - 1
+            WHERE user_id = OLD.user_id AND month = date_trunc('month', OLD.date::date)::date
+              AND category = OLD.category;
+            -- A month with no expenses left drops out of summaries instead of showing 0
+            DELETE FROM expenses_monthly_totals
+            WHERE user_id = OLD.user_id AND month = date_trunc('month', OLD.date::date)::date
+              AND category = OLD.category AND expense_count = 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO expenses_monthly_totals AS t
+            VALUES (NEW.user_id, date_trunc('month', NEW.date::date)::date, NEW.category, NEW.amount, 1)
+            ON CONFLICT (user_id, month, category)
+            DO UPDATE SET total = t.total + EXCLUDED.total, expense_count = t.expense_count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    f"COMMENT ON FUNCTION expenses_monthly_totals_apply() IS '{MONTHLY_ROLLUP_VERSION}'",
+    # Backfill from scratch while the lock (taken first) keeps writers out
+    "DELETE FROM expenses_monthly_totals",
+    """
+    INSERT INTO expenses_monthly_totals
+    SELECT user_id, date_trunc('month', date::date)::date, category, SUM(amount), COUNT(*)
+    FROM expenses
+    GROUP BY 1, 2, 3
+    """,
+    # Note-only updates don't touch the totals, so they skip the trigger
+    "DROP TRIGGER IF EXISTS expenses_monthly_totals_trg ON expenses",
+    """
+    CREATE TRIGGER expenses_monthly_totals_trg
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, date, amount, category ON expenses
+    FOR EACH ROW EXECUTE FUNCTION expenses_monthly_totals_apply()
+    """,
+    "DROP TRIGGER IF EXISTS expenses_monthly_totals_truncate_trg ON expenses",
+    """
+    CREATE TRIGGER expenses_monthly_totals_truncate_trg
+    AFTER TRUNCATE ON expenses
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_monthly_totals_apply()
+    """,
+    # Superseded: it was refreshed in full on every write
+    "DROP MATERIALIZED VIEW IF EXISTS expenses_monthly",
+]
+MONTHLY_ROLLUP_READY = False
+# The version installed in the database, read from the trigger function's comment
+ROLLUP_VERSION_QUERY = """
+    SELECT obj_description(t.tgfoid, 'pg_proc') FROM pg_trigger t
+    WHERE t.tgrelid = 'expenses'::regclass AND t.tgname = 'expenses_monthly_totals_trg'
+"""
+
+def installed_rollup_version(cur):
+    """The MONTHLY_ROLLUP_VERSION the database's trigger was installed with, or None."""
+    cur.execute(ROLLUP_VERSION_QUERY)
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def ensure_monthly_rollup():
+    """
+    Installs (or upgrades) the monthly totals when opted in with BOOTSTRAP_INDEXES=1.
+    True when the database runs this server's MONTHLY_ROLLUP_VERSION, so it can be read.
+    """
+    # The lock, backfill and trigger must commit together
+    with get_db_connection(transaction=True) as conn:
+        with conn.cursor() as cur:
+            if installed_rollup_version(cur) != MONTHLY_ROLLUP_VERSION and os.getenv("BOOTSTRAP_INDEXES") == "1":
+                # Blocks writes (not reads) until commit, so no row slips between the
+                # backfill and the trigger; re-check in case another server just did it
+                cur.execute("LOCK TABLE expenses IN SHARE ROW EXCLUSIVE MODE")
+                if installed_rollup_version(cur) != MONTHLY_ROLLUP_VERSION:
+                    for ddl in MONTHLY_ROLLUP_DDL:
+                        cur.execute(ddl)
+            ready = installed_rollup_version(cur) == MONTHLY_ROLLUP_VERSION
+        conn.commit()
+    return ready
+
+if db_pool and os.getenv("BOOTSTRAP_INDEXES") == "1":
     try:
-        yield conn
-    finally:
-        db_pool.putconn(conn)
+        ensure_indexes()
+    except Exception as e:
+        # Missing indexes only cost speed, so keep serving instead of setting STARTUP_ERROR
+        print(f"Index setup skipped: {e.__class__.__name__}: {e}")
+if db_pool:
+    try:
+        IDEMPOTENCY_READY = ensure_idempotency_key()
+    except Exception as e:
+        # Without the column and index, add_expense refuses idempotency keys
+        print(f"Idempotency key setup skipped: {e.__class__.__name__}: {e}")
+    try:
+        MONTHLY_ROLLUP_READY = ensure_monthly_rollup()
+    except Exception as e:
+        # Without the rollup, summaries simply read the base table
+        print(f"Monthly rollup setup skipped: {e.__class__.__name__}: {e}")
+
+def run_in_thread(fn):
+    """
+    Runs a blocking psycopg2 tool in a worker thread, so the event loop keeps
+    serving other MCP calls while this one waits on Supabase.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return wrapper
 
 # 3. Helper to get user and handle errors centrally
+# Placeholder IDs that mean "we don't know who this is yet", compared after strip()
+# and lower() so no spelling or stray whitespace slips past the check
+GUEST_IDS = frozenset({"", "guest"})
+# This specific string tells the LLM what to do next
+IDENTITY_ERROR = "IDENTITY_ERROR: I do not know the user's name yet. Please ask the user: 'What is your name?' and then try again with their answer."
+
 def ensure_user_identity(user_id):
     """
     Checks if the user is 'guest'. If so, returns an error message
     that forces Claude to ask the user for their name.
     """
-    if not user_id or user_id.lower() == 'guest':
-        # This specific string tells the LLM what to do next
-        return "IDENTITY_ERROR: I do not know the user's name yet. Please ask the user: 'What is your name?' and then try again with their answer."
+    if not user_id or user_id.strip().lower() in GUEST_IDS:
+        return IDENTITY_ERROR
     return None
 
+def parse_date(value):
+    """
+    Parses a YYYY-MM-DD date locally, so a bad date never costs a round trip and a
+    good one binds as a real DATE. Returns None when the value isn't a valid date.
+    """
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
 ## Tool-1: Adding expense
+ADD_EXPENSE_QUERY = """
+    INSERT INTO expenses (user_id, date, amount, category, subcategory, note)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    RETURNING id
+"""
+# A retry with a key that was already used inserts nothing and returns no row
+IDEMPOTENT_ADD_EXPENSE_QUERY = """
+    INSERT INTO expenses (user_id, date, amount, category, subcategory, note, idempotency_key)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (user_id, idempotency_key) DO NOTHING
+    RETURNING id
+"""
+
+class ExpenseRejected(ValueError):
+    """
+    Raised by the *_row helpers when an operation can't be applied (bad input,
+    unknown expense). The message is meant for the model; batch_execute rolls
+    back the whole batch when any operation raises it.
+    """
+
+def add_expense_row(cur, user_id, date, amount, category, subcategory='', note='', idempotency_key=None):
+    """Inserts one expense on the given (tuple) cursor."""
+    day = parse_date(date)
+    if day is None:
+        raise ExpenseRejected(f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01').")
+    if idempotency_key is None:
+        cur.execute(ADD_EXPENSE_QUERY, (user_id, day, amount, category, subcategory, note))
+        return f'Expense added successfully. ID: {cur.fetchone()[0]}'
+
+    # Without the unique index (see IDEMPOTENCY_DDL) a retry would add the expense again,
+    # so refuse the key rather than quietly break the promise made to the caller
+    if not IDEMPOTENCY_READY:
+        raise ExpenseRejected("Error: idempotency_key is not enabled on this server. Call again without it.")
+
+    cur.execute(IDEMPOTENT_ADD_EXPENSE_QUERY, (user_id, day, amount, category, subcategory, note, idempotency_key))
+    row = cur.fetchone()
+    if row:
+        return f'Expense added successfully. ID: {row[0]}'
+    # Already added by an earlier call: hand back that expense's id instead of a duplicate
+    cur.execute(
+        "SELECT id FROM expenses WHERE user_id = %s AND idempotency_key = %s",
+        (user_id, idempotency_key)
+    )
+    return f'Expense already added with this idempotency_key. ID: {cur.fetchone()[0]}'
+
 @mcp.tool()
-def add_expense(date: str, amount: float, category: str, subcategory: str = '', note: str = '', user_id: str = 'guest'):
-    """Add a new expense. User ID defaults to guest."""
+@run_in_thread
+def add_expense(date: str, amount: float, category: str, subcategory: str = '', note: str = '', user_id: str = 'guest', idempotency_key: str | None = None):
+    """
+    Add a new expense. User ID defaults to guest.
+    Pass a unique idempotency_key (e.g. a receipt number) so retrying the call never adds the expense twice;
+    if the server hasn't enabled keys, the call is refused and nothing is added.
+    """
 
     # 1. Check Identity
     identity_error = ensure_user_identity(user_id)
@@ -259,24 +561,67 @@ def add_expense(date: str, amount: float, category: str, subcategory: str = '',
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO expenses (user_id, date, amount, category, subcategory, note)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (user_id, date, amount, category, subcategory, note)
+                return add_expense_row(cur, user_id, date, amount, category, subcategory, note, idempotency_key)
+    except ExpenseRejected as e:
+        return str(e)
+    except Exception as e:
+        return f"Database error: {str(e)}"
+
+## Tool-1b: Bulk import
+@mcp.tool()
+@run_in_thread
+def add_expenses_bulk(items: list[dict], user_id: str = 'guest'):
+    """
+    Add many expenses in one call, e.g. a month of receipts.
+    Each item needs date, amount and category; subcategory and note are optional.
+    """
+    # 1. Check Identity
+    identity_error = ensure_user_identity(user_id)
+    if identity_error:
+        return identity_error
+
+    # 2. Validate everything up front so a bad row doesn't waste a round trip
+    days = [parse_date(item.get('date')) for item in items]
+    for item, day in zip(items, days):
+        if day is None:
+            return f"Error: Invalid date format '{item.get('date')}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
+
+    try:
+        rows = [
+            (user_id, day, item['amount'], item['category'], item.get('subcategory', ''), item.get('note', ''))
+            for item, day in zip(items, days)
+        ]
+        # Every page of the import commits together, or not at all
+        with get_db_connection(transaction=True) as conn:
+            with conn.cursor() as cur:
+                # One multi-row INSERT ... VALUES (...), (...) per page instead of a round trip per row
+                new_rows = execute_values(
+                    cur,
+                    "INSERT INTO expenses (user_id, date, amount, category, subcategory, note) VALUES %s RETURNING id",
+                    rows,
+                    page_size=500,
+                    fetch=True
                 )
-                new_id = cur.fetchone()['id']
                 conn.commit()
-                return f'Expense added successfully. ID: {new_id}'
+                new_ids = ', '.join(str(row[0]) for row in new_rows)
+                return f"{len(new_rows)} expenses added successfully. IDs: {new_ids}"
+    except KeyError as e:
+        return f"Error: Every expense needs date, amount and category (missing {e})."
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ## Tool-2: List expenses
+# One page per call keeps a wide date range from streaming thousands of rows back to the model
+LIST_PAGE_SIZE = 500
+MAX_LIST_PAGE_SIZE = 5000
+# Cursors return plain tuples; the column names are attached once per row here
+# instead of the cursor building a RealDictRow for every row it fetches
+LIST_COLUMNS = ("id", "date", "amount", "category", "subcategory", "note")
+
 @mcp.tool()
-def list_expenses(start_date: str, end_date: str, user_id: str = 'guest'):
-    """List expenses for a specific date range."""
+@run_in_thread
+def list_expenses(start_date: str, end_date: str, user_id: str = 'guest', limit: int = LIST_PAGE_SIZE, offset: int = 0):
+    """List expenses for a specific date range, one page of at most `limit` rows; raise `offset` for the next page."""
 
     # 1. Check Identity
     identity_error = ensure_user_identity(user_id)
@@ -285,26 +630,65 @@ def list_expenses(start_date: str, end_date: str, user_id: str = 'guest'):
     
     try:
         with get_db_connection() as conn:
+            # The page is capped, so one plain execute and fetch beats a server-side cursor
             with conn.cursor() as cur:
                 cur.execute(
                     """
-                    SELECT * FROM expenses
+                    SELECT id, date, amount, category, subcategory, note FROM expenses
                     WHERE user_id = %s AND
                     date BETWEEN %s AND %s
-                    ORDER BY date ASC
+                    ORDER BY date ASC, id ASC
+                    LIMIT %s OFFSET %s
                     """,
-                    (user_id, start_date, end_date)
+                    (user_id, start_date, end_date, min(limit, MAX_LIST_PAGE_SIZE), offset)
                 )
-                rows = cur.fetchall()
+                rows = [dict(zip(LIST_COLUMNS, row)) for row in cur.fetchall()]
                 # Return empty list description instead of None to help LLM
                 if not rows:
                     return f"No expenses found for user {user_id} between {start_date} and {end_date}."
-                return str(rows)
+                return rows  # FastMCP serializes these to JSON
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ### Tool-3: Summarize expenses
+SUMMARY_COLUMNS = ("category", "total_amount")
+# Both query shapes are fixed, so build them once instead of on every call
+SUMMARY_QUERY = """
+    SELECT category, SUM(amount) as total_amount
+    FROM expenses
+    WHERE user_id = %s AND date BETWEEN %s AND %s
+    GROUP BY category ORDER BY category ASC
+"""
+CATEGORY_SUMMARY_QUERY = """
+    SELECT category, SUM(amount) as total_amount
+    FROM expenses
+    WHERE user_id = %s AND date BETWEEN %s AND %s AND category = %s
+    GROUP BY category ORDER BY category ASC
+"""
+MONTHLY_SUMMARY_QUERY = """
+    SELECT category, SUM(total) as total_amount
+    FROM expenses_monthly_totals
+    WHERE user_id = %s AND month BETWEEN %s AND %s
+    GROUP BY category ORDER BY category ASC
+"""
+MONTHLY_CATEGORY_SUMMARY_QUERY = """
+    SELECT category, SUM(total) as total_amount
+    FROM expenses_monthly_totals
+    WHERE user_id = %s AND month BETWEEN %s AND %s AND category = %s
+    GROUP BY category ORDER BY category ASC
+"""
+
+def spans_whole_months(start_date, end_date):
+    """True when the range runs from the 1st of a month to the last day of a month."""
+    try:
+        start = datetime.date.fromisoformat(start_date)
+        end = datetime.date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        return False
+    return start.day == 1 and (end + datetime.timedelta(days=1)).day == 1
+
 @mcp.tool()
+@run_in_thread
 def summarize_expenses(start_date: str, end_date: str, category: str | None = None, user_id: str = 'guest'):
     """
     Summarize expenses with optional category filter.
@@ -317,30 +701,37 @@ def summarize_expenses(start_date: str, end_date: str, category: str | None = No
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                query = """
-                    SELECT category, SUM(amount) as total_amount
-                    FROM expenses
-                    WHERE user_id = %s AND date BETWEEN %s AND %s
-                """
-                parameters = [user_id, start_date, end_date]
-                
+                # Whole-month ranges can be answered from the monthly rollup
+                if MONTHLY_ROLLUP_READY and spans_whole_months(start_date, end_date):
+                    query, category_query = MONTHLY_SUMMARY_QUERY, MONTHLY_CATEGORY_SUMMARY_QUERY
+                else:
+                    query, category_query = SUMMARY_QUERY, CATEGORY_SUMMARY_QUERY
+
                 # Only filter by category if one is actually provided
                 if category:
-                    query += " AND category = %s"
-                    parameters.append(category)
-                
-                query += " GROUP BY category ORDER BY category ASC"
-                
-                cur.execute(query, parameters)
+                    cur.execute(category_query, (user_id, start_date, end_date, category))
+                else:
+                    cur.execute(query, (user_id, start_date, end_date))
                 rows = cur.fetchall()
                 if not rows:
                     return f"No expenses found for user {user_id}."
-                return str(rows)
+                return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]  # FastMCP serializes these to JSON
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ### Tool-4: Delete expense
+def delete_expense_row(cur, user_id, expense_id):
+    """Deletes one expense on the given cursor."""
+    cur.execute(
+        "DELETE FROM expenses WHERE id = %s AND user_id = %s",
+        (expense_id, user_id)
+    )
+    if cur.rowcount == 0:
+        raise ExpenseRejected(f"Expense ID {expense_id} not found for user {user_id}.")
+    return f"Expense ID {expense_id} deleted successfully."
+
 @mcp.tool()
+@run_in_thread
 def delete_expense(expense_id: int, user_id: str = 'guest'):
     """Delete an expense by ID."""
     # 1. Check Identity
@@ -351,28 +742,71 @@ def delete_expense(expense_id: int, user_id: str = 'guest'):
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "DELETE FROM expenses WHERE id = %s AND user_id = %s",
-                    (expense_id, user_id)
-                )
-                if cur.rowcount == 0:
-                    return f"Expense ID {expense_id} not found for user {user_id}."
-                conn.commit()
-                return f"Expense ID {expense_id} deleted successfully."
+                return delete_expense_row(cur, user_id, expense_id)
+    except ExpenseRejected as e:
+        return str(e)
     except Exception as e:
         return f"Database error: {str(e)}"
 
 ## Tool-5: Update Expense
+# Leading/trailing runs of whitespace and quotes, trimmed in a single pass
+EDGE_QUOTES_RE = re.compile(r"""^[\s'"]+|[\s'"]+$""")
+
 def clean_input(value):
     """
     Helper: Removes extra quotes and spaces that might confuse the database.
     Example: "'2026-01-01'" -> "2026-01-01"
     """
     if isinstance(value, str):
-        return value.strip().strip("'").strip('"')
+        return EDGE_QUOTES_RE.sub('', value)
     return value
 
+# Every combination of updatable columns gets its UPDATE text built once at import,
+# keyed by a bitmask of the provided fields (bit 0 = date ... bit 4 = note)
+UPDATE_COLUMNS = ("date", "amount", "category", "subcategory", "note")
+UPDATE_QUERIES = {
+    mask: "UPDATE expenses SET "
+          + ", ".join(f"{column} = %s" for bit, column in enumerate(UPDATE_COLUMNS) if mask & (1 << bit))
+          + " WHERE id = %s AND user_id = %s"
+    for mask in range(1, 1 << len(UPDATE_COLUMNS))
+}
+
+def update_expense_row(cur, user_id, expense_id, date=None, amount=None, category=None, subcategory=None, note=None):
+    """Updates the provided fields of one expense on the given cursor."""
+    # 1. Clean up inputs (remove accidentally added quotes)
+    date = clean_input(date)
+    category = clean_input(category)
+    subcategory = clean_input(subcategory)
+    note = clean_input(note)
+
+    # 2. VALIDATION: Parse the date here (catches 2026 as well as 2025-13-45)
+    if date:
+        day = parse_date(date)
+        if day is None:
+            raise ExpenseRejected(f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01').")
+        date = day
+
+    # 3. Work out which fields were provided (same order as UPDATE_COLUMNS)
+    values = (date, amount, category, subcategory, note)
+    provided = (bool(date), amount is not None, bool(category), subcategory is not None, note is not None)
+    mask = sum(1 << bit for bit, is_set in enumerate(provided) if is_set)
+
+    if not mask:
+        raise ExpenseRejected("No fields provided for update.")
+
+    # 4. Pick the prebuilt query for this combination of fields
+    params = [value for value, is_set in zip(values, provided) if is_set]
+    params.extend([expense_id, user_id])
+
+    cur.execute(UPDATE_QUERIES[mask], params)
+    
+    # 5. Check if we actually found the row
+    if cur.rowcount == 0:
+        raise ExpenseRejected(f"Expense ID {expense_id} not found for user {user_id}.")
+    return f"Expense ID {expense_id} updated successfully."
+
 @mcp.tool()
+@run_in_thread
 def update_expense(
     expense_id: int, 
     date: str | int | None = None,     # Allow int so we can catch it gracefully
@@ -391,67 +825,83 @@ def update_expense(
     if identity_error:
         return identity_error
     try:
-        # 1. Clean up inputs (remove accidentally added quotes)
-        date = clean_input(date)
-        category = clean_input(category)
-        subcategory = clean_input(subcategory)
-        note = clean_input(note)
-
-        # 2. VALIDATION: Check if Date is a number (e.g. 2026) instead of a string
-        if isinstance(date, int) or (isinstance(date, str) and date.isdigit()):
-            return f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
-
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                fields_to_update = []
-                params = []
-
-                # 3. Build the query dynamically based on what was provided
-                if date:
-                    fields_to_update.append("date = %s")
-                    params.append(date)
-                if amount is not None:
-                    fields_to_update.append("amount = %s")
-                    params.append(amount)
-                if category:
-                    fields_to_update.append("category = %s")
-                    params.append(category)
-                if subcategory is not None: 
-                    fields_to_update.append("subcategory = %s")
-                    params.append(subcategory)
-                if note is not None:
-                    fields_to_update.append("note = %s")
-                    params.append(note)
-
-                if not fields_to_update:
-                    return "No fields provided for update."
-
-                # 4. Final Query Construction
-                query = f"""
-                    UPDATE expenses
-                    SET {', '.join(fields_to_update)}
-                    WHERE id = %s AND user_id = %s
-                """
-                params.extend([expense_id, user_id])
-
-                cur.execute(query, params)
-                
-                # 5. Check if we actually found the row
-                if cur.rowcount == 0:
-                    return f"Expense ID {expense_id} not found for user {user_id}."
+                return update_expense_row(cur, user_id, expense_id, date, amount, category, subcategory, note)
                 
+    except ExpenseRejected as e:
+        return str(e)
+    except Exception as e:
+        return f"Database error: {str(e)}"
+
+## Tool-6: Batch several writes into one call
+# Operations batch_execute can dispatch, keyed by the tool they mirror
+BATCH_OPERATIONS = {
+    "add_expense": add_expense_row,
+    "delete_expense": delete_expense_row,
+    "update_expense": update_expense_row,
+}
+# Checked against each op's args up front, so a malformed op is reported as such
+BATCH_SIGNATURES = {name: inspect.signature(fn) for name, fn in BATCH_OPERATIONS.items()}
+
+def check_batch_args(op, user_id):
+    """Returns why op's args don't fit its operation (unknown or missing fields), or None."""
+    args = op.get("args", {})
+    if not isinstance(args, dict):
+        return "Error: args must be an object of field names to values."
+    try:
+        BATCH_SIGNATURES[op["tool"]].bind(None, user_id, **args)
+    except TypeError as e:
+        return f"Error: Invalid args ({e})."
+    return None
+
+@mcp.tool()
+@run_in_thread
+def batch_execute(ops: list[dict], user_id: str = 'guest'):
+    """
+    Run several add/update/delete operations in one call and one transaction.
+    Each op looks like {"tool": "add_expense", "args": {"date": "2026-01-01", "amount": 12.5, "category": "food"}}.
+    If any op fails, none of them are applied.
+    """
+    # 1. Check Identity
+    identity_error = ensure_user_identity(user_id)
+    if identity_error:
+        return identity_error
+
+    # 2. Reject unknown operations and malformed args before touching the database
+    for number, op in enumerate(ops, start=1):
+        if op.get("tool") not in BATCH_OPERATIONS:
+            return f"Error: Unsupported tool '{op.get('tool')}'. Use one of: {', '.join(BATCH_OPERATIONS)}."
+        error = check_batch_args(op, user_id)
+        if error:
+            return f"Operation {number} ({op['tool']}) failed: {error} No operations were applied."
+
+    try:
+        # One COMMIT for the whole batch instead of one per operation
+        with get_db_connection(transaction=True) as conn:
+            with conn.cursor() as cur:
+                results = []
+                for number, op in enumerate(ops, start=1):
+                    try:
+                        results.append(BATCH_OPERATIONS[op["tool"]](cur, user_id, **op.get("args", {})))
+                    except ExpenseRejected as e:
+                        # All or nothing: undo the operations that already ran
+                        conn.rollback()
+                        return f"Operation {number} ({op['tool']}) failed: {e} No operations were applied."
                 conn.commit()
-                return f"Expense ID {expense_id} updated successfully."
-                
+                return results
     except Exception as e:
+        # The pool rolls back the open transaction when the connection is returned
         return f"Database error: {str(e)}"
     
 
+# Categories never change while the process runs, so serialize them once
+CATEGORIES_JSON = json.dumps(Categories, indent=2)
+
 @mcp.resource("expense://categories", mime_type="application/json")
 def categories():
     """Resource: Expense Categories (embedded for cloud deployment)"""
-    import json
-    return json.dumps(Categories, indent=2)
+    return CATEGORIES_JSON
 
 # For local development only
 if __name__ == "__main__":
@@ -1,8 +1,19 @@
 import os
+import re
+import atexit
+import asyncio
+import inspect
+import datetime
+import functools
+import threading
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import pool
+from psycopg2.extras import execute_values
+from psycopg2.extensions import parse_dsn, make_dsn
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
 from fastmcp.server.auth.providers.github import GitHubProvider
 from fastmcp.server.dependencies import get_access_token
 from typing import Optional
@@ -33,145 +44,510 @@ auth_provider = GitHubProvider(
 
 mcp = FastMCP("Cloud-Expense-Tracker", auth=auth_provider)
 
-# 2. Database Connection Helper
-def get_db_connection():
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
+# 2. Database Connection Pool
+# One pool for the whole process, so a tool call borrows an open connection instead of
+# paying TCP + TLS + auth to Supabase every time. Keepalives stop idle pooled
+# connections from being dropped silently by NATs/load balancers.
+CONNECTION_DEFAULTS = {
+    "sslmode": "require",
+    "keepalives": "1",
+    "keepalives_idle": "30",
+}
+
+# Supabase's transaction-mode pooler (port 6543, or set POOL_MODE=transaction)
+# multiplexes many client connections onto a few Postgres backends. Consecutive
+# transactions may run on different backends, so session state such as PREPAREd
+# statements must not be relied on there.
+TRANSACTION_POOLING = (
+    os.getenv("POOL_MODE", "").lower() == "transaction"
+    or ":6543" in (DB_URL or "")
+)
+
+# The hot queries never change shape, so each physical connection PREPAREs them once
+# and the tools call EXECUTE: Postgres skips parsing and planning on every call.
+# Behind a transaction pooler they run as plain SQL instead (see STATEMENT_SQL).
+# Parameter types are inferred from the expenses columns.
+PREPARED_STATEMENTS = {
+    "add_expense_stmt": """
+        INSERT INTO expenses (user_id, date, amount, category, subcategory, note)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id
+    """,
+    "summary_stmt": """
+        SELECT category, SUM(amount) as total_amount
+        FROM expenses
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3
+        GROUP BY category ORDER BY category ASC
+    """,
+    "category_summary_stmt": """
+        SELECT category, SUM(amount) as total_amount
+        FROM expenses
+        WHERE user_id = $1 AND date BETWEEN $2 AND $3 AND category = $4
+        GROUP BY category ORDER BY category ASC
+    """,
+    "delete_expense_stmt": "DELETE FROM expenses WHERE id = $1 AND user_id = $2",
+}
+# update_expense has one statement per combination of provided fields, keyed by a
+# bitmask (bit 0 = date ... bit 4 = note)
+UPDATE_COLUMNS = ("date", "amount", "category", "subcategory", "note")
+for mask in range(1, 1 << len(UPDATE_COLUMNS)):
+    columns = [column for bit, column in enumerate(UPDATE_COLUMNS) if mask & (1 << bit)]
+    assignments = ", ".join(f"{column} = ${n}" for n, column in enumerate(columns, start=1))
+    PREPARED_STATEMENTS[f"update_expense_stmt_{mask}"] = (
+        f"UPDATE expenses SET {assignments} WHERE id = ${len(columns) + 1} AND user_id = ${len(columns) + 2}"
+    )
+
+# What the tools run for each statement, with psycopg2 %s placeholders: an EXECUTE of
+# the prepared statement, or behind a transaction pooler the plain parameterized SQL
+# (each $n appears once and in order, so it maps straight onto %s)
+PARAMETER_RE = re.compile(r"\$\d+")
+STATEMENT_SQL = {}
+for name, query in PREPARED_STATEMENTS.items():
+    if TRANSACTION_POOLING:
+        STATEMENT_SQL[name] = PARAMETER_RE.sub("%s", query)
+    else:
+        STATEMENT_SQL[name] = f"EXECUTE {name} ({', '.join(['%s'] * len(PARAMETER_RE.findall(query)))})"
+UPDATE_EXECUTES = {mask: STATEMENT_SQL[f"update_expense_stmt_{mask}"] for mask in range(1, 1 << len(UPDATE_COLUMNS))}
+# Session settings live as long as the connection, so they're applied once, not per call.
+# Behind a transaction pooler a SET would stick to whichever backend ran it, leaking to
+# other clients (or be missing on the next transaction), so none are sent there.
+SESSION_SETTINGS = {
+    "application_name": "expense-mcp-github",  # Names this server in pg_stat_activity
+    "statement_timeout": "30s",  # A runaway query fails instead of pinning a pooled connection
+}
+# The SETs and all PREPAREs go out in one execute: one round trip per new connection
+SESSION_SETUP = "" if TRANSACTION_POOLING else ";\n".join(
+    [f"SET {name} = '{value}'" for name, value in SESSION_SETTINGS.items()]
+    + [f"PREPARE {name} AS {query}" for name, query in PREPARED_STATEMENTS.items()]
+)
+# The summaries scan date ranges from a day to years, so they must never switch to
+# one generic plan that can settle on a seq scan. SET LOCAL travels in the same
+# execute (one implicit transaction under autocommit); add/delete keep generic plans.
+# Plain SQL is planned on every call anyway, so it needs no such hint.
+CUSTOM_PLAN = "" if TRANSACTION_POOLING else "SET LOCAL plan_cache_mode = force_custom_plan;\n"
+SUMMARY_EXECUTE = CUSTOM_PLAN + STATEMENT_SQL["summary_stmt"]
+CATEGORY_SUMMARY_EXECUTE = CUSTOM_PLAN + STATEMENT_SQL["category_summary_stmt"]
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that keeps one plain cursor for every tool call that borrows it."""
+    shared_cursor = None
+    initialized = False
+
+    def reusable_cursor(self):
+        # psycopg2 cursors can run any number of queries, so there's no need to build one per call
+        if self.shared_cursor is None or self.shared_cursor.closed:
+            self.shared_cursor = self.cursor()
+        return self.shared_cursor
+
+    def initialize(self):
+        """Applies SESSION_SETUP the first time the pool hands this connection out."""
+        if SESSION_SETUP:
+            self.reusable_cursor().execute(SESSION_SETUP)
+        self.commit()  # No-op in autocommit; the settings and statements outlive transactions anyway
+        self.initialized = True
+
+MIN_CONNECTIONS = 2
+MAX_CONNECTIONS = 10
+# Tools run in worker threads, so more calls than connections can be in flight at once
+db_slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+
+try:
+    # Parse the URL (or key=value DSN) and only fill in the options the user didn't set
+    dsn_params = parse_dsn(DB_URL)
+    for key, value in CONNECTION_DEFAULTS.items():
+        dsn_params.setdefault(key, value)
+    db_pool = psycopg2.pool.ThreadedConnectionPool(
+        minconn=MIN_CONNECTIONS,
+        maxconn=MAX_CONNECTIONS,
+        dsn=make_dsn(**dsn_params),
+        connection_factory=PooledConnection,
+    )
+    atexit.register(db_pool.closeall)
+except Exception as e:
+    print(f"Error creating connection pool: {e}")
+    db_pool = None
+
+@contextmanager
+def get_db_connection(transaction=False):
+    """
+    Borrow a connection from the pool and always put it back.
+    By default the connection is in autocommit mode: a single statement is its own
+    transaction, with no BEGIN or COMMIT round trips. Pass transaction=True when
+    several statements must commit together, then commit.
+    """
+    if not db_pool:
+        raise Exception("Database pool is not initialized.")
+
+    # Wait for a free connection instead of failing with "pool exhausted"
+    with db_slots:
+        conn = db_pool.getconn()
+        try:
+            conn.autocommit = not transaction
+            if not conn.initialized:
+                conn.initialize()
+        except Exception:
+            # PREPAREs that ran before a failed setup stay on the backend, so a retry on
+            # this connection would fail with "already exists": discard it instead
+            db_pool.putconn(conn, close=True)
+            raise
+        try:
+            yield conn
+        finally:
+            db_pool.putconn(conn)
+
+# Composite indexes for the hot filters: every query narrows by user_id, then a
+# date range (optionally a category), and list_expenses orders by date.
+# INCLUDE (amount) lets the category summary SUM straight from the index.
+# Opt-in with BOOTSTRAP_INDEXES=1, so only the deploy that owns the schema runs DDL.
+INDEX_DDL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_expenses_user_cat_date_amount ON expenses (user_id, category, date) INCLUDE (amount)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_expenses_user_cat_date",
+]
+
+# A CONCURRENTLY build that fails leaves an INVALID index behind, and IF NOT EXISTS
+# then skips it forever; such leftovers are dropped so the DDL builds them again
+INVALID_INDEXES = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE i.indrelid = 'expenses'::regclass AND NOT i.indisvalid AND c.relname = ANY(%s)
+"""
+
+def drop_invalid_indexes(cur, names):
+    """Drops whichever of the named indexes on expenses were left INVALID."""
+    cur.execute(INVALID_INDEXES, (list(names),))
+    for (name,) in cur.fetchall():
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+def ensure_indexes():
+    """Creates the query indexes if they are missing. Cheap no-op once they exist."""
+    # Autocommit connection: CONCURRENTLY cannot run inside a transaction block
+    with get_db_connection() as conn:
+        cur = conn.reusable_cursor()
+        # Building an index on a big table can outlast the per-query timeout
+        # (only set on direct connections, see SESSION_SETTINGS)
+        if not TRANSACTION_POOLING:
+            cur.execute("SET statement_timeout = 0")
+        try:
+            drop_invalid_indexes(cur, ("idx_expenses_user_date", "idx_expenses_user_cat_date_amount"))
+            for ddl in INDEX_DDL:
+                cur.execute(ddl)
+            # Fresh statistics so the planner picks the new indexes right away
+            cur.execute("ANALYZE expenses")
+        finally:
+            if not TRANSACTION_POOLING:
+                cur.execute(f"SET statement_timeout = '{SESSION_SETTINGS['statement_timeout']}'")
+
+if db_pool and os.getenv("BOOTSTRAP_INDEXES") == "1":
+    try:
+        ensure_indexes()
+    except Exception as e:
+        # Missing indexes only cost speed, so keep serving
+        print(f"Error creating indexes: {e}")
 
 # Helper to get user and handle errors centrally
 def get_current_user():
-    from fastmcp.server.dependencies import get_access_token
     try:
         token = get_access_token()
         return token.claims.get("login")
     except Exception:
         return None
 
-# --- TOOLS ---
+NOT_LOGGED_IN = "Error: You are not logged in. Please authenticate via the login URL."
 
-@mcp.tool()
-def add_expense(date: str, amount: float, category: str, subcategory: str = '', note: str = ''):
-    """Add a new expense. Automatically linked to your GitHub identity."""
+def require_user():
+    """Returns the caller's GitHub login, or ends the tool call with a login hint."""
     current_user = get_current_user()
     if not current_user:
-        return "Error: You are not logged in. Please authenticate via the login URL."
+        # ToolError reaches the client as a failed call carrying just this message
+        raise ToolError(NOT_LOGGED_IN)
+    return current_user
 
+def run_in_thread(fn):
+    """
+    Runs a blocking psycopg2 tool in a worker thread, so the event loop keeps
+    serving other MCP calls while this one waits on the database.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        # to_thread copies the context, so get_access_token() still sees the caller
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return wrapper
+
+class ExpenseRejected(ValueError):
+    """
+    Raised by the *_row helpers when an operation can't be applied (bad input,
+    unknown expense). The message is meant for the model; batch_execute rolls
+    back the whole batch when any operation raises it.
+    """
+
+def parse_date(value):
+    """
+    Parses a YYYY-MM-DD date locally, so a bad date never costs a round trip and a
+    good one binds as a real DATE. Returns None when the value isn't a valid date.
+    """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO expenses (user_id, date, amount, category, subcategory, note)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (current_user, date, amount, category, subcategory, note)
-                )
-                new_id = cur.fetchone()['id']
-                conn.commit()
-                return f'Expense added successfully. ID: {new_id}'
-    except Exception as e:
-        return f"Database error: {str(e)}"
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def tool_with_db(fn):
+    """
+    Shared setup for tools whose body is a single autocommit call: checks the login,
+    lends the connection's cursor and reports database failures as a message.
+    The wrapped function takes (cur, current_user, *tool arguments).
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        current_user = require_user()
+        try:
+            with get_db_connection() as conn:
+                return fn(conn.reusable_cursor(), current_user, *args, **kwargs)
+        except ExpenseRejected as e:
+            return str(e)
+        except Exception as e:
+            return f"Database error: {str(e)}"
+    # The tool schema shows only the caller's arguments, not cur and current_user
+    signature = inspect.signature(fn)
+    wrapper.__signature__ = signature.replace(parameters=list(signature.parameters.values())[2:])
+    return wrapper
+
+# Every summary query returns these two columns
+SUMMARY_COLUMNS = ["category", "total_amount"]
+
+# --- TOOLS ---
+
+def add_expense_row(cur, current_user, date, amount, category, subcategory='', note=''):
+    """Inserts one expense for the user on the given cursor."""
+    day = parse_date(date)
+    if day is None:
+        raise ExpenseRejected(f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01').")
+    cur.execute(
+        STATEMENT_SQL["add_expense_stmt"],
+        (current_user, day, amount, category, subcategory, note)
+    )
+    new_id = cur.fetchone()[0]
+    return f'Expense added successfully. ID: {new_id}'
 
 @mcp.tool()
-def list_expenses(start_date: str, end_date: str):
-    """List only your expenses within a date range."""
-    current_user = get_current_user()
-    if not current_user:
-        return "Error: You are not logged in."
+@run_in_thread
+@tool_with_db
+def add_expense(cur, current_user, date: str, amount: float, category: str, subcategory: str = '', note: str = ''):
+    """Add a new expense. Automatically linked to your GitHub identity."""
+    return add_expense_row(cur, current_user, date, amount, category, subcategory, note)
+
+@mcp.tool()
+@run_in_thread
+def add_expenses_bulk(items: list[dict]):
+    """Add many of your expenses in one call. Each item needs date, amount and category; subcategory and note are optional."""
+    current_user = require_user()
+
+    # Validate every date up front so a bad row doesn't waste a round trip
+    days = [parse_date(item.get('date')) for item in items]
+    for item, day in zip(items, days):
+        if day is None:
+            return f"Error: Invalid date format '{item.get('date')}'. Please use YYYY-MM-DD (e.g., '2026-01-01')."
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT * FROM expenses WHERE user_id = %s AND date BETWEEN %s AND %s ORDER BY date ASC",
-                    (current_user, start_date, end_date)
-                )
-                rows = cur.fetchall()
-                return str(rows) if rows else f"No expenses found for {current_user}."
+        rows = [
+            (current_user, day, item['amount'], item['category'], item.get('subcategory', ''), item.get('note', ''))
+            for item, day in zip(items, days)
+        ]
+        # Every page of the import commits together, or not at all
+        with get_db_connection(transaction=True) as conn:
+            cur = conn.reusable_cursor()
+            # One multi-row INSERT per 500 items instead of a round trip per row
+            new_rows = execute_values(
+                cur,
+                "INSERT INTO expenses (user_id, date, amount, category, subcategory, note) VALUES %s RETURNING id",
+                rows,
+                page_size=500,
+                fetch=True
+            )
+            conn.commit()
+            new_ids = ', '.join(str(row[0]) for row in new_rows)
+            return f"{len(new_rows)} expenses added successfully. IDs: {new_ids}"
+    except KeyError as e:
+        return f"Error: Every expense needs date, amount and category (missing {e})."
     except Exception as e:
         return f"Database error: {str(e)}"
 
+# One page per call keeps a wide date range from streaming thousands of rows back to the model
+LIST_PAGE_SIZE = 500
+MAX_LIST_PAGE_SIZE = 5000
+
 @mcp.tool()
-def summarize_expenses(start_date: str, end_date: str, category: Optional[str] = None):
+@run_in_thread
+@tool_with_db
+def list_expenses(cur, current_user, start_date: str, end_date: str, limit: int = LIST_PAGE_SIZE, offset: int = 0):
+    """List only your expenses within a date range, at most `limit` rows per page; raise `offset` for the next page."""
+    # The page is capped, so one plain execute and fetch beats a server-side cursor
+    cur.execute(
+        "SELECT id, date, amount, category, subcategory, note FROM expenses WHERE user_id = %s AND date BETWEEN %s AND %s ORDER BY date ASC, id ASC LIMIT %s OFFSET %s",
+        (current_user, start_date, end_date, min(limit, MAX_LIST_PAGE_SIZE), offset)
+    )
+    # Plain tuple rows plus one column list, instead of building a dict per row.
+    # An empty range is the same shape with no rows, not a sentence to parse.
+    return {"columns": [d[0] for d in cur.description], "rows": cur.fetchall()}
+
+@mcp.tool()
+@run_in_thread
+@tool_with_db
+def summarize_expenses(cur, current_user, start_date: str, end_date: str, category: Optional[str] = None):
     """Summarize your expenses with optional category filter."""
-    current_user = get_current_user()
-    if not current_user:
-        return "Error: You are not logged in."
-    
-    try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                query = """
-                    SELECT category, SUM(amount) as total_amount
-                    FROM expenses
-                    WHERE user_id = %s AND date BETWEEN %s AND %s
-                """
-                params = [current_user, start_date, end_date]
-                if category:
-                    query += " AND category = %s"
-                    params.append(category)
-                query += " GROUP BY category ORDER BY category ASC"
-                
-                cur.execute(query, params)
-                rows = cur.fetchall()
-                return str(rows) if rows else "No expenses found."
-    except Exception as e:
-        return f"Database error: {str(e)}"
+    if category:
+        cur.execute(CATEGORY_SUMMARY_EXECUTE, (current_user, start_date, end_date, category))
+    else:
+        cur.execute(SUMMARY_EXECUTE, (current_user, start_date, end_date))
+    return {"columns": SUMMARY_COLUMNS, "rows": cur.fetchall()}
+
+# The range is read once into the CTE and both halves of the report come from it;
+# Postgres builds the whole response, in the same columns/rows shape as the tools above.
+# Amounts are cast to text because the other tools return them as strings (Decimal).
+REPORT_QUERY = """
+    WITH e AS (
+        SELECT id, date, amount, category, subcategory, note
+        FROM expenses
+        WHERE user_id = %s AND date BETWEEN %s AND %s
+    )
+    SELECT json_build_object(
+        'expenses', json_build_object(
+            'columns', json_build_array('id', 'date', 'amount', 'category', 'subcategory', 'note'),
+            'rows', COALESCE((
+                SELECT json_agg(json_build_array(id, date, amount::text, category, subcategory, note) ORDER BY date, id)
+                FROM (SELECT * FROM e ORDER BY date, id LIMIT %s) page
+            ), '[]')
+        ),
+        'summary', json_build_object(
+            'columns', json_build_array('category', 'total_amount'),
+            'rows', COALESCE((
+                SELECT json_agg(json_build_array(category, total_amount::text) ORDER BY category)
+                FROM (SELECT category, SUM(amount) AS total_amount FROM e GROUP BY category) s
+            ), '[]')
+        )
+    )
+"""
 
 @mcp.tool()
-def delete_expense(expense_id: int):
+@run_in_thread
+@tool_with_db
+def report_expenses(cur, current_user, start_date: str, end_date: str, limit: int = LIST_PAGE_SIZE):
+    """List your expenses in a date range (first `limit` rows) together with per-category totals for the whole range."""
+    cur.execute(REPORT_QUERY, (current_user, start_date, end_date, min(limit, MAX_LIST_PAGE_SIZE)))
+    return cur.fetchone()[0]
+
+def delete_expense_row(cur, current_user, expense_id):
+    """Deletes one of the user's expenses on the given cursor."""
+    cur.execute(STATEMENT_SQL["delete_expense_stmt"], (expense_id, current_user))
+    if cur.rowcount == 0:
+        raise ExpenseRejected(f"Expense ID {expense_id} not found or access denied.")
+    return f"Expense ID {expense_id} deleted successfully."
+
+@mcp.tool()
+@run_in_thread
+@tool_with_db
+def delete_expense(cur, current_user, expense_id: int):
     """Delete your expense by ID."""
-    current_user = get_current_user()
-    if not current_user:
-        return "Error: You are not logged in."
+    return delete_expense_row(cur, current_user, expense_id)
 
-    try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("DELETE FROM expenses WHERE id = %s AND user_id = %s", (expense_id, current_user))
-                if cur.rowcount == 0:
-                    return f"Expense ID {expense_id} not found or access denied."
-                conn.commit()
-                return f"Expense ID {expense_id} deleted successfully."
-    except Exception as e:
-        return f"Database error: {str(e)}"
+def update_expense_row(cur, current_user, expense_id, date=None, amount=None, category=None, subcategory=None, note=None):
+    """Updates the provided fields of one of the user's expenses on the given cursor."""
+    if date:
+        day = parse_date(date)
+        if day is None:
+            raise ExpenseRejected(f"Error: Invalid date format '{date}'. Please use YYYY-MM-DD (e.g., '2026-01-01').")
+        date = day
+
+    # Which fields were provided, as a bitmask in UPDATE_COLUMNS order
+    values = (date, amount, category, subcategory, note)
+    provided = (bool(date), amount is not None, bool(category), subcategory is not None, note is not None)
+    mask = sum(1 << bit for bit, is_set in enumerate(provided) if is_set)
+
+    if not mask: raise ExpenseRejected("No fields provided for update.")
+
+    params = [value for value, is_set in zip(values, provided) if is_set]
+    params.extend([expense_id, current_user])
+    cur.execute(UPDATE_EXECUTES[mask], params)
+    if cur.rowcount == 0:
+        raise ExpenseRejected(f"Expense ID {expense_id} not found or access denied.")
+    return f"Expense ID {expense_id} updated successfully."
 
 @mcp.tool()
-def update_expense(expense_id: int, date: str = None, amount: float = None, category: str = None, subcategory: str = None, note: str = None):
+@run_in_thread
+@tool_with_db
+def update_expense(cur, current_user, expense_id: int, date: str = None, amount: float = None, category: str = None, subcategory: str = None, note: str = None):
     """Update your expense by ID with provided fields."""
-    current_user = get_current_user()
-    if not current_user:
-        return "Error: You are not logged in."
+    return update_expense_row(cur, current_user, expense_id, date, amount, category, subcategory, note)
+
+# Write operations batch_execute can run, each taking (cursor, user, **args)
+BATCH_OPERATIONS = {
+    "add_expense": add_expense_row,
+    "delete_expense": delete_expense_row,
+    "update_expense": update_expense_row,
+}
+# Checked against each op's args up front, so a malformed op is reported as such
+BATCH_SIGNATURES = {name: inspect.signature(fn) for name, fn in BATCH_OPERATIONS.items()}
+
+def check_batch_args(op, current_user):
+    """Returns why op's args don't fit its operation (unknown or missing fields), or None."""
+    args = op.get("args", {})
+    if not isinstance(args, dict):
+        return "Error: args must be an object of field names to values."
+    try:
+        BATCH_SIGNATURES[op["tool"]].bind(None, current_user, **args)
+    except TypeError as e:
+        return f"Error: Invalid args ({e})."
+    return None
+
+@mcp.tool()
+@run_in_thread
+def batch_execute(ops: list[dict]):
+    """
+    Run several of your add/update/delete operations in one call and one transaction,
+    e.g. every line of an imported bank statement.
+    Each op looks like {"tool": "add_expense", "args": {"date": "2026-01-01", "amount": 12.5, "category": "food"}}.
+    If any op fails, none of them are applied.
+    """
+    current_user = require_user()
+
+    for number, op in enumerate(ops, start=1):
+        if op.get("tool") not in BATCH_OPERATIONS:
+            return f"Error: Unsupported tool '{op.get('tool')}'. Use one of: {', '.join(BATCH_OPERATIONS)}."
+        error = check_batch_args(op, current_user)
+        if error:
+            return f"Operation {number} ({op['tool']}) failed: {error} No operations were applied."
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                fields = []
-                params = []
-                if date: fields.append("date = %s"); params.append(date)
-                if amount: fields.append("amount = %s"); params.append(amount)
-                if category: fields.append("category = %s"); params.append(category)
-                if subcategory: fields.append("subcategory = %s"); params.append(subcategory)
-                if note: fields.append("note = %s"); params.append(note)
-
-                if not fields: return "No fields provided for update."
-
-                query = f"UPDATE expenses SET {', '.join(fields)} WHERE id = %s AND user_id = %s"
-                params.extend([expense_id, current_user])
-                cur.execute(query, params)
-                if cur.rowcount == 0:
-                    return f"Expense ID {expense_id} not found or access denied."
-                conn.commit()
-                return f"Expense ID {expense_id} updated successfully."
+        # One COMMIT for the whole batch instead of one per operation
+        with get_db_connection(transaction=True) as conn:
+            cur = conn.reusable_cursor()
+            results = []
+            for number, op in enumerate(ops, start=1):
+                try:
+                    results.append(BATCH_OPERATIONS[op["tool"]](cur, current_user, **op.get("args", {})))
+                except ExpenseRejected as e:
+                    # All or nothing: undo the operations that already ran
+                    conn.rollback()
+                    return f"Operation {number} ({op['tool']}) failed: {e} No operations were applied."
+            conn.commit()
+            return results
     except Exception as e:
+        # The pool rolls back the open transaction when the connection is returned
         return f"Database error: {str(e)}"
 
+# Categories file contents, re-read only when the file's mtime changes
+categories_cache = {"mtime": None, "data": None}
+
 @mcp.resource("expense://categories", mime_type="application/json")
 def categories():
-    if not os.path.exists(CATEGORIES_PATH):
+    try:
+        mtime = os.stat(CATEGORIES_PATH).st_mtime_ns
+    except FileNotFoundError:
         return '["Food", "Travel", "Bills", "Other"]'
-    with open(CATEGORIES_PATH, 'r') as f:
-        return f.read()
+    if mtime != categories_cache["mtime"]:
+        with open(CATEGORIES_PATH, 'r') as f:
+            categories_cache["data"] = f.read()
+        categories_cache["mtime"] = mtime
+    return categories_cache["data"]
 
 if __name__ == "__main__":
     mcp.run(transport="http", host="0.0.0.0", port=8000)
\ No newline at end of file